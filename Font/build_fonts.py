@@ -0,0 +1,164 @@
+"""
+Subset the Font/*.pak variants down to the characters our translations use.
+
+    python build_fonts.py [--force] [--repak PATH]
+
+1. Collects every character from TextGame/vi/*.csv and the ConfigDB lang_*.db tables.
+2. For each pak: unpack with repak, subset every .ufont/.ttf/.otf with fontTools,
+   repack into Font/build/<name>.pak.
+3. Records the charset hash per pak in Font/build/manifest.json, so a pak is only
+   rebuilt when the corpus gains characters or the source pak changes.
+
+Requires: fontTools (pip install fonttools) and repak.
+"""
+import os
+import sys
+import csv
+import glob
+import json
+import shutil
+import sqlite3
+import hashlib
+import argparse
+import tempfile
+import importlib.util
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+BUILD_DIR = os.path.join(HERE, "build")
+MANIFEST_FILE = os.path.join(BUILD_DIR, "manifest.json")
+TEXTGAME_DIR = os.path.join(ROOT, "TextGame", "vi")
+CONFIGDB_DIR = os.path.join(ROOT, "TiengViet_99_P", "Client", "Content", "Aki", "ConfigDB")
+DEFAULT_REPAK = os.path.join(ROOT, "mod unpacker + packer", "repak", "repak.exe")
+AES_KEY = "0x6F80948821CA338739A24D4D9F778BCAC0996B2EF2A73897A789C68AFF05174E"
+FONT_EXTS = (".ufont", ".ttf", ".otf")
+
+# Always kept, even if the corpus doesn't use them yet (player names, numbers, new patches)
+BASE_CHARS = (
+    "".join(chr(c) for c in range(0x20, 0x7F)) +
+    "ÀÁÂÃÈÉÊÌÍÒÓÔÕÙÚÝàáâãèéêìíòóôõùúýĂăĐđĨĩŨũƠơƯư"
+    "ẠạẢảẤấẦầẨẩẪẫẬậẮắẰằẲẳẴẵẶặẸẹẺẻẼẽẾếỀềỂểỄễỆệỈỉỊịỌọỎỏỐốỒồỔổỖỗỘộỚớỜờỞởỠỡỢợỤụỦủỨứỪừỬửỮữỰựỲỳỴỵỶỷỸỹ"
+    " …–—‘’“”•·©®™°×"
+)
+
+
+# --- CORPUS ---
+def collect_charset():
+    chars = set(BASE_CHARS)
+    for path in glob.glob(os.path.join(TEXTGAME_DIR, "*.csv")):
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.reader(f):
+                for cell in row[1:]:
+                    chars.update(cell)
+    for path in glob.glob(os.path.join(CONFIGDB_DIR, "**", "*.db"), recursive=True):
+        con = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            tables = [r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+            for table in tables:
+                cols = [r[1] for r in con.execute(f'PRAGMA table_info("{table}")')]
+                if "Content" not in cols: continue
+                for (content,) in con.execute(f'SELECT Content FROM "{table}"'):
+                    if isinstance(content, str): chars.update(content)
+        finally:
+            con.close()
+    # Control characters never need glyphs
+    return {c for c in chars if ord(c) >= 0x20 or c in "\t"}
+
+
+def charset_hash(chars):
+    return hashlib.sha1("".join(sorted(chars)).encode('utf-8')).hexdigest()
+
+
+# --- MANIFEST ---
+def load_manifest():
+    try:
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def save_manifest(manifest):
+    with open(MANIFEST_FILE, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=4)
+
+
+def pak_fingerprint(pak):
+    st = os.stat(pak)
+    return f"{st.st_size}-{int(st.st_mtime)}"
+
+
+# --- BUILD ---
+def subset_font(path, unicodes):
+    from fontTools import subset
+    options = subset.Options()
+    options.layout_features = ["*"]
+    options.name_IDs = ["*"]
+    options.name_languages = ["*"]
+    options.notdef_outline = True
+    options.glyph_names = True
+    font = subset.load_font(path, options, dontLoadGlyphNames=False)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=unicodes)
+    subsetter.subset(font)
+    subset.save_font(font, path, options)
+
+
+def build_pak(pak, repak, unicodes, out_pak):
+    work = tempfile.mkdtemp(prefix="font_subset_")
+    try:
+        unpacked = os.path.join(work, "unpacked")
+        subprocess.run([repak, "--aes-key", AES_KEY, "unpack", "-o", unpacked, pak], check=True)
+        fonts = [os.path.join(d, f) for d, _, files in os.walk(unpacked) for f in files
+                 if f.lower().endswith(FONT_EXTS)]
+        if not fonts:
+            print(f"  no font files in {os.path.basename(pak)}, skipped")
+            return False
+        for font in fonts:
+            before = os.path.getsize(font)
+            subset_font(font, unicodes)
+            print(f"  {os.path.basename(font)}: {before // 1024} KB -> {os.path.getsize(font) // 1024} KB")
+        subprocess.run([repak, "pack", "-v", "--version", "V12", unpacked, "--", out_pak], check=True)
+        return True
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Subset Font/*.pak to the translated corpus charset.")
+    parser.add_argument("--force", action="store_true", help="rebuild every pak")
+    parser.add_argument("--repak", default=DEFAULT_REPAK if os.path.exists(DEFAULT_REPAK) else shutil.which("repak"),
+                        help="path to the repak executable")
+    args = parser.parse_args()
+
+    if not args.repak:
+        sys.exit("repak not found. Pass --repak PATH.")
+    if importlib.util.find_spec("fontTools") is None:
+        sys.exit("fontTools is required: pip install fonttools")
+
+    chars = collect_charset()
+    digest = charset_hash(chars)
+    unicodes = sorted(ord(c) for c in chars)
+    print(f"Corpus charset: {len(chars)} characters ({digest[:12]})")
+
+    os.makedirs(BUILD_DIR, exist_ok=True)
+    manifest = load_manifest()
+    for pak in sorted(glob.glob(os.path.join(HERE, "*.pak"))):
+        name = os.path.basename(pak)
+        out_pak = os.path.join(BUILD_DIR, name)
+        entry = manifest.get(name, {})
+        fingerprint = pak_fingerprint(pak)
+        if (not args.force and os.path.exists(out_pak) and entry.get("charset") == digest
+                and entry.get("source") == fingerprint):
+            print(f"{name}: up to date")
+            continue
+        print(f"{name}: building")
+        if build_pak(pak, args.repak, unicodes, out_pak):
+            manifest[name] = {"charset": digest, "source": fingerprint}
+            save_manifest(manifest)
+            print(f"  {os.path.getsize(pak) // 1024} KB -> {os.path.getsize(out_pak) // 1024} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,14 @@
 import os
 import shutil
-import json
-import re
-import time
 import threading
-import math
-import requests
-import queue
+import bisect
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
 import ctypes
+from engine import (config_data, stop_event, OUTPUT_FILE, TEMP_OUTPUT_FILE, JOURNAL_FILE,
+                    load_config, save_config, load_models_cache, fetch_models, plan_ranges, data_start,
+                    get_translation_memory, reset_run_stats, run_summary, worker_process)
+from input_loader import LineIndex, ResultJournal, journal_matches
 
 # Enable High DPI
 # try:
@@ -20,223 +19,60 @@ import ctypes
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("blue")
 
-# --- CONSTANTS & CONFIG ---
-CONFIG_FILE = "config.json"
-INPUT_FILE = "temp.txt"
-OUTPUT_FILE = "tran.txt"
-TEMP_OUTPUT_FILE = "temp_translating.txt"
-
-DEFAULT_SYSTEM_PROMPT = (
-    "# ROLE: Master of Game Localization (English to Vietnamese)\n"
-    "# CONTEXT: Wuthering Waves (Kuro Games) - Sci-fi, Post-apocalyptic, Solaris-3.\n\n"
-    "## 1. MANDATORY TECHNICAL PROTOCOL (STRICT):\n"
-    "- FORMAT: Always '{ID}:::{TranslatedText}'. One ID per line. NO blank lines between IDs.\n"
-    "- INTEGRITY: Preserve {tags}. No new braces.\n"
-    "- LITERALS: Keep '\\n' as literal.\n"
-    "- NO CHAT: Output ONLY translated content.\n\n"
-    "## 5. FINAL EXECUTION:\n"
-    "Translate EVERY line. Format: ID:::Text"
-)
-
-DEFAULT_CONFIG = {
-    "base_url": "https://api.mistral.ai/v1",
-    "api_key": "",
-    "model": "mistral-large-latest",
-    "system_prompt": DEFAULT_SYSTEM_PROMPT,
-    "temperature": 0.2,
-    "max_tokens": 4096,
-    "top_p": 1.0,
-    "top_k": -1, # -1 means ignore
-    "stream": True,
-    "threads": 1,
-    "batch_size": 50,
-    "delay": 1.3,
-    "last_file": "temp.txt"
-}
-
-# --- GLOBAL STATE ---
-config_data = DEFAULT_CONFIG.copy()
-request_lock = threading.Lock()
-file_write_lock = threading.Lock()
-last_request_time = 0
-shared_output_lines = [] 
-stop_event = threading.Event()
-fetched_models_cache = []
-
-# --- UTILS ---
-def load_config():
-    global config_data
-    if os.path.exists(CONFIG_FILE):
-        try:
-            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                loaded = json.load(f)
-                # Update default with loaded to ensure all keys exist
-                for k, v in loaded.items():
-                    config_data[k] = v
-        except Exception as e:
-            print(f"Error loading config: {e}")
-
-def save_config():
-    try:
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(config_data, f, indent=4, ensure_ascii=False)
-    except Exception as e:
-        print(f"Error saving config: {e}")
-
-def wait_for_slot(delay_sec):
-    global last_request_time
-    with request_lock:
-        current_time = time.time()
-        elapsed = current_time - last_request_time
-        if elapsed < delay_sec:
-            time.sleep(delay_sec - elapsed)
-        last_request_time = time.time()
-
-def save_progress_file():
-    with file_write_lock:
-        with open(TEMP_OUTPUT_FILE, 'w', encoding='utf-8') as f:
-            for line in shared_output_lines:
-                f.write(line + '\n')
-
-# --- API LOGIC ---
-def call_api_translate(batch_lines, settings, log_callback=None):
-    if stop_event.is_set(): return batch_lines
-
-    prompt = "\n".join(batch_lines) + "\n\nREMINDER: Format 'ID:::TranslatedText'."
-    
-    wait_for_slot(settings['delay'])
-    
-    endpoint = f"{settings['base_url'].rstrip('/')}/chat/completions"
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {settings['api_key']}"
-    }
-    
-    payload = {
-        "model": settings['model'],
-        "messages": [
-            {"role": "system", "content": settings['system_prompt']},
-            {"role": "user", "content": prompt},
-        ],
-        "temperature": settings['temperature'],
-        "max_tokens": settings['max_tokens'],
-        "top_p": settings['top_p'],
-        "stream": settings['stream']
-    }
-    
-    # Optional parameters
-    if settings.get('top_k', -1) > 0:
-        payload['top_k'] = settings['top_k']
-
-    try:
-        response = requests.post(endpoint, headers=headers, json=payload, timeout=120, stream=settings['stream'])
-        
-        if response.status_code != 200:
-            err = f"API Error {response.status_code}: {response.text}"
-            if log_callback: log_callback(err)
-            return batch_lines
-
-        full_content = ""
-        
-        if settings['stream']:
-            for line in response.iter_lines():
-                if stop_event.is_set(): break
-                if line:
-                    decoded = line.decode('utf-8').strip()
-                    if decoded.startswith("data: "):
-                        data_str = decoded[6:]
-                        if data_str == "[DONE]": break
-                        try:
-                            data_json = json.loads(data_str)
-                            delta = data_json['choices'][0].get('delta', {})
-                            content = delta.get('content', '')
-                            if content:
-                                full_content += content
-                                if log_callback: log_callback(content, end="")
-                        except:
-                            pass
-            if log_callback: log_callback("\n[Stream Finished]")
-        else:
-            # Non-stream
-            json_resp = response.json()
-            full_content = json_resp['choices'][0]['message']['content']
-            if log_callback: log_callback(f"Received: {len(full_content)} chars")
-
-        translated_lines = full_content.strip().split('\n')
-        translated_map = {}
-        for line in translated_lines:
-            if ':::' in line:
-                parts = line.split(':::', 1)
-                t_id = parts[0].strip()
-                t_text = parts[1].strip()
-                translated_map[t_id] = t_text
-            else:
-                match = re.match(r"^(\d+)\s*(?:[|:>.)\]])\s*(.*)", line)
-                if match:
-                    translated_map[match.group(1)] = match.group(2).strip()
-
-        results = []
-        for line in batch_lines:
-            o_id = line.split(':::')[0].strip()
-            final_text = translated_map.get(o_id, line.split(':::')[1].strip() if ':::' in line else line)
-            results.append(f"{o_id}:::{final_text}")
-        return results
-
-    except Exception as e:
-        if log_callback: log_callback(f"Exception: {e}")
-        return batch_lines
-
-def worker_process(thread_id, chunk_data, settings, ui_callback):
+# --- CUSTOM WIDGETS ---
+
+class ModelIndex:
     """
-    ui_callback: function(current, total, log_msg)
+    Sorted, lower-cased view of the model names.
+    Prefix hits come from a bisect over the sorted keys, substring hits from
+    str.find over one joined blob, so a search never loops in Python per name.
     """
-    local_lines = [item[0] for item in chunk_data]
-    local_indices = [item[1] for item in chunk_data]
-    total_items = len(local_lines)
-    
-    start_idx = local_indices[0] if local_indices else 0
-    end_idx = local_indices[-1] if local_indices else 0
-    
-    # Init UI
-    ui_callback(0, total_items, f"Ready. Range: {start_idx}-{end_idx}")
-
-    batch_size = settings['batch_size']
-    processed = 0
-
-    for i in range(0, total_items, batch_size):
-        if stop_event.is_set():
-            ui_callback(processed, total_items, "Stopped.")
-            break
-
-        batch_lines = local_lines[i:i+batch_size]
-        batch_indices = local_indices[i:i+batch_size]
-        
-        # Define log callback for this thread
-        def thread_log(msg, end="\n"):
-            ui_callback(processed, total_items, msg, append=True)
-
-        translated_batch = call_api_translate(batch_lines, settings, log_callback=thread_log)
-        
-        for idx, result_line in zip(batch_indices, translated_batch):
-            shared_output_lines[idx] = result_line
-        
-        save_progress_file()
-        processed += len(batch_lines)
-        ui_callback(processed, total_items, "", append=False)
-    
-    ui_callback(total_items, total_items, "Finished.")
-
-# --- CUSTOM WIDGETS ---
+    def __init__(self, names):
+        self.names = sorted(names, key=str.lower)
+        self.keys = [n.lower() for n in self.names]
+        self.blob = "\n".join(self.keys)
+        self.starts = []
+        pos = 0
+        for k in self.keys:
+            self.starts.append(pos)
+            pos += len(k) + 1
+
+    def search(self, query):
+        query = query.lower().strip()
+        if not query: return self.names
+        lo = bisect.bisect_left(self.keys, query)
+        hi = bisect.bisect_left(self.keys, query + "\uffff")
+        result = self.names[lo:hi]
+        seen = set(range(lo, hi))
+        pos = self.blob.find(query)
+        while pos != -1:
+            idx = bisect.bisect_right(self.starts, pos) - 1
+            if idx not in seen:
+                seen.add(idx)
+                result.append(self.names[idx])
+            pos = self.blob.find(query, self.starts[idx] + len(self.keys[idx]) + 1)
+        return result
 
 class SearchableComboBox(ctk.CTkFrame):
     """
     A searchable combobox that uses an internal Frame overlay instead of Toplevel,
     so the dropdown stays attached to the main window.
+    The list is virtualized: a fixed pool of row buttons is re-labelled on scroll,
+    so thousands of models cost the same as ten.
     """
+    VISIBLE_ROWS = 7
+    ROW_HEIGHT = 28
+    FILTER_DEBOUNCE_MS = 150
+
     def __init__(self, master, variable=None, values=None, width=200, height=32, load_command=None, **kwargs):
         super().__init__(master, width=width, height=height, fg_color="transparent", **kwargs)
         self.variable = variable
         self.values = values or []
+        self.index = ModelIndex(self.values)
+        self.filtered = self.values
+        self.top = 0
+        self.row_buttons = []
+        self.filter_job = None
         self.load_command = load_command
         self.root_window = self.winfo_toplevel() # Get the root CTk window
         self.grid_columnconfigure(0, weight=1)
@@ -253,8 +89,9 @@ class SearchableComboBox(ctk.CTkFrame):
 
     def set_values(self, values):
         self.values = values
+        self.index = ModelIndex(values)
         if self.dropdown_frame and self.dropdown_frame.winfo_exists():
-            self.populate_list(self.values)
+            self.apply_filter()
 
     def on_arrow_click(self):
         if not self.values and self.load_command:
@@ -263,8 +100,12 @@ class SearchableComboBox(ctk.CTkFrame):
 
     def toggle_dropdown(self):
         if self.dropdown_frame and self.dropdown_frame.winfo_exists():
+            if self.filter_job:
+                self.after_cancel(self.filter_job)
+                self.filter_job = None
             self.dropdown_frame.destroy()
             self.dropdown_frame = None
+            self.row_buttons = []
             return
         
         # Create dropdown as a Frame placed on the ROOT WINDOW
@@ -313,24 +154,73 @@ class SearchableComboBox(ctk.CTkFrame):
         search_entry.pack(fill="x", padx=5, pady=5)
         search_entry.focus_set()
         
-        # Scrollable List
-        self.scroll_frame = ctk.CTkScrollableFrame(self.dropdown_frame)
-        self.scroll_frame.pack(fill="both", expand=True, padx=5, pady=(0, 5))
-        self.populate_list(self.values)
+        # Virtual List: fixed row pool + scrollbar
+        list_frame = ctk.CTkFrame(self.dropdown_frame, fg_color="transparent")
+        list_frame.pack(fill="both", expand=True, padx=5, pady=(0, 5))
+        list_frame.grid_columnconfigure(0, weight=1)
+        self.scrollbar = ctk.CTkScrollbar(list_frame, command=self.on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, rowspan=self.VISIBLE_ROWS, sticky="ns")
+        self.row_buttons = []
+        for r in range(self.VISIBLE_ROWS):
+            btn = ctk.CTkButton(list_frame, text="", anchor="w", fg_color="transparent",
+                                height=self.ROW_HEIGHT, command=lambda r=r: self.on_row_click(r))
+            btn.grid(row=r, column=0, sticky="ew")
+            for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+                btn.bind(seq, self.on_mousewheel)
+            self.row_buttons.append(btn)
+        self.apply_filter()
         
         # Bind click-outside to close (optional, simple version: close on focus out of search_entry is tricky)
         # For now, clicking the arrow again will close it.
 
     def filter_list(self, *args):
-        query = self.search_var.get().lower()
-        filtered = [v for v in self.values if query in v.lower()]
-        self.populate_list(filtered)
-
-    def populate_list(self, items):
-        for w in self.scroll_frame.winfo_children(): w.destroy()
-        for item in items:
-            ctk.CTkButton(self.scroll_frame, text=item, anchor="w", fg_color="transparent", 
-                          height=28, command=lambda i=item: self.on_select(i)).pack(fill="x")
+        # Debounce: only filter once typing pauses
+        if self.filter_job: self.after_cancel(self.filter_job)
+        self.filter_job = self.after(self.FILTER_DEBOUNCE_MS, self.apply_filter)
+
+    def apply_filter(self):
+        self.filter_job = None
+        query = self.search_var.get() if self.search_var else ""
+        self.filtered = self.index.search(query)
+        self.top = 0
+        self.render_rows()
+
+    def render_rows(self):
+        if not self.row_buttons: return
+        total = len(self.filtered)
+        for r, btn in enumerate(self.row_buttons):
+            idx = self.top + r
+            if idx < total:
+                btn.configure(text=self.filtered[idx], state="normal")
+            else:
+                btn.configure(text="", state="disabled")
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + self.VISIBLE_ROWS) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def scroll_to(self, top):
+        max_top = max(0, len(self.filtered) - self.VISIBLE_ROWS)
+        self.top = max(0, min(int(top), max_top))
+        self.render_rows()
+
+    def on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self.scroll_to(float(value) * len(self.filtered))
+        elif action == "scroll":
+            step = self.VISIBLE_ROWS if unit == "pages" else 1
+            self.scroll_to(self.top + int(value) * step)
+
+    def on_mousewheel(self, event):
+        if getattr(event, 'num', None) == 4 or getattr(event, 'delta', 0) > 0:
+            self.scroll_to(self.top - 3)
+        else:
+            self.scroll_to(self.top + 3)
+
+    def on_row_click(self, r):
+        idx = self.top + r
+        if idx < len(self.filtered):
+            self.on_select(self.filtered[idx])
             
     def on_select(self, item):
         if self.variable: self.variable.set(item)
@@ -393,8 +283,8 @@ class SettingsWindow(ctk.CTkToplevel):
         self.config['stream'] = self.v_stream.get()
         
         # Save to file
-        global config_data
-        config_data = self.config
+        if self.config is not config_data:
+            config_data.update(self.config)
         save_config()
         self.destroy()
 
@@ -512,7 +402,7 @@ class MainApp(ctk.CTk):
         
         self.cb_model = SearchableComboBox(mod_box, variable=self.v_model, load_command=self.lazy_load_models)
         self.cb_model.grid(row=0, column=0, sticky="ew", padx=5)
-        ctk.CTkButton(mod_box, text="↻", width=30, command=self.load_models).grid(row=0, column=1)
+        ctk.CTkButton(mod_box, text="↻", width=30, command=lambda: self.load_models(force=True)).grid(row=0, column=1)
 
         # ARGS (Threads, Batch, Delay)
         arg_frame = ctk.CTkFrame(conf_frame, fg_color="#333")
@@ -559,20 +449,21 @@ class MainApp(ctk.CTk):
         if not self.cb_model.values:
             self.load_models()
 
-    def load_models(self):
+    def load_models(self, force=False):
         url = self.v_base_url.get().rstrip('/')
         key = self.v_api_key.get()
         if not url: return
         
+        if not force:
+            cached = load_models_cache(url, config_data.get('models_cache_ttl', 86400))
+            if cached:
+                self.cb_model.set_values(cached)
+                return
+        
         def run():
-            try:
-                r = requests.get(f"{url}/models", headers={"Authorization": f"Bearer {key}"}, timeout=5)
-                if r.status_code == 200:
-                    data = r.json()
-                    lst = [m['id'] for m in data['data']] if 'data' in data else [str(m) for m in data]
-                    lst.sort()
-                    self.cb_model.set_values(lst)
-            except: pass
+            lst = fetch_models(url, key)
+            if lst is not None:
+                self.after(0, lambda: self.cb_model.set_values(lst)) # Tk calls only from main thread
         threading.Thread(target=run, daemon=True).start()
 
     def stop_process(self):
@@ -614,68 +505,58 @@ class MainApp(ctk.CTk):
         threading.Thread(target=self.run_logic).start()
 
     def run_logic(self):
-        global shared_output_lines
-        shared_output_lines = []
+        reset_run_stats()
+        source = None
+        journal = None
+        completed = False
         
         try:
-            with open(self.input_path, 'r', encoding='utf-8') as f:
-                raw = [l.strip() for l in f.readlines()]
-            
-            # Init shared lines
-            has_header = raw and raw[0].startswith("0:::")
-            shared_output_lines = []
-            process_data = [] # List of (line, global_index)
-            
-            # Simple init
-            for i, line in enumerate(raw):
-                if ':::' in line:
-                    o_id = line.split(':::')[0].strip()
-                    shared_output_lines.append(f"{o_id}:::")
-                else:
-                    shared_output_lines.append(line)
-            
-            start_off = 1 if has_header else 0
-            # Data for workers
-            data_points = []
-            for i, line in enumerate(raw[start_off:]):
-                 data_points.append((line, start_off + i))
-            
-            total = len(data_points)
-            n_threads = max(1, config_data['threads'])
-            chunk_size = math.ceil(total / n_threads)
+            # Index line offsets only; workers read their batches straight from the mmap
+            source = LineIndex(self.input_path)
+            resume = (journal_matches(JOURNAL_FILE, source) and
+                      messagebox.askyesno("Resume", "An unfinished run of this file was found. Resume it?"))
+            journal = ResultJournal(JOURNAL_FILE, source, resume=resume)
+            if resume: print(f"Resuming: {journal.recovered()} lines already translated")
             
-            chunks = []
-            for i in range(0, total, chunk_size):
-                chunks.append(data_points[i:i+chunk_size])
-            chunks = [c for c in chunks if c]
+            if config_data.get('tm_enabled'):
+                get_translation_memory(config_data) # Build before workers start
+            ranges = plan_ranges(source, config_data['threads'])
             
             # Create widgets in Main Thread
             self.thread_widgets = []
-            for i, chunk in enumerate(chunks):
-                first_idx = chunk[0][1]
-                last_idx = chunk[-1][1]
-                w = ThreadProgressWidget(self.scroll_progress, i+1, f"{first_idx}-{last_idx}")
+            for i, line_range in enumerate(ranges):
+                w = ThreadProgressWidget(self.scroll_progress, i+1, f"{line_range[0]}-{line_range[-1]}")
                 w.pack(fill="x", pady=2)
                 self.thread_widgets.append(w)
             
             threads = []
-            for i, chunk in enumerate(chunks):
+            for i, line_range in enumerate(ranges):
                 w_widget = self.thread_widgets[i]
                 t = threading.Thread(target=worker_process, 
-                                     args=(i+1, chunk, config_data, w_widget.update_progress))
+                                     args=(i+1, source, line_range, journal, config_data, w_widget.update_progress))
                 threads.append(t)
                 t.start()
             
             for t in threads: t.join()
             
-            if not stop_event.is_set():
+            # Stream the results back in input order (partial progress is kept on STOP too)
+            journal.assemble(source, TEMP_OUTPUT_FILE)
+            if not stop_event.is_set() and not journal.is_done(range(data_start(source), len(source))):
+                messagebox.showwarning("Incomplete", "Some batches failed and were left untranslated.\n"
+                                       "Start the run again to resume and retry them.")
+            elif not stop_event.is_set():
+                completed = True
                 if os.path.exists(OUTPUT_FILE): os.remove(OUTPUT_FILE)
                 shutil.copy(TEMP_OUTPUT_FILE, OUTPUT_FILE)
-                messagebox.showinfo("Done", f"Finished. {OUTPUT_FILE}")
+                messagebox.showinfo("Done", f"Finished. {OUTPUT_FILE}\n{run_summary()}")
+            print(run_summary())
 
         except Exception as e:
             print(e)
         finally:
+            # Keep the journal unless the run finished and was assembled, so it can be resumed
+            if journal: journal.close(remove=completed)
+            if source: source.close()
             self.is_running = False
             self.toggle_inputs(True)
 
@@ -0,0 +1,52 @@
+"""
+Startup-time benchmark for the translator and the mod unpacker.
+Runs each target in a fresh interpreter and prints min/median wall time.
+GUI targets are timed until their window has been built and drawn once
+(needs a display); importing the modules runs no launch-time setup.
+
+    python bench_startup.py [runs]
+"""
+import os
+import sys
+import time
+import statistics
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+UNPACKER_DIR = os.path.join(HERE, "..", "mod unpacker + packer")
+
+WINDOW_READY = "app = {}; app.update(); app.destroy()"
+
+TARGETS = [
+    ("translator engine (headless)", HERE, "import engine"),
+    ("translator window ready", HERE, "import base; " + WINDOW_READY.format("base.MainApp()")),
+    ("mod unpacker window ready", UNPACKER_DIR, "import mod_unpacker_gui as m; " + WINDOW_READY.format("m.App()")),
+]
+
+
+def time_run(cwd, code, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        if proc.returncode != 0:
+            return None, proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"
+        samples.append(elapsed)
+    return samples, None
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    baseline, _ = time_run(HERE, "pass", runs)
+    print(f"Interpreter baseline: {statistics.median(baseline)*1000:.0f} ms (median of {runs})")
+    for name, cwd, code in TARGETS:
+        samples, err = time_run(cwd, code, runs)
+        if err:
+            print(f"{name:32s} skipped: {err}")
+            continue
+        print(f"{name:32s} min {min(samples)*1000:6.0f} ms   median {statistics.median(samples)*1000:6.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Full-text index over every ConfigDB lang_*.db table and the TextGame CSVs.
+
+    python corpus_search.py build                 # (re)index changed sources only
+    python corpus_search.py search "Tacet Field" [--lang vi] [--table ItemInfo] [--limit 20]
+
+One SQLite FTS5 index (corpus_index.db) holds Id, table, language and source
+file for every Content row. 'build' compares each source's size/mtime with the
+last run and only re-reads the files that changed. Matching ignores case and
+Vietnamese diacritics ("tan cong" finds "Tấn Công"). search() is the Python API.
+
+Chinese/Japanese/Korean text has no spaces, so CJK_LANGS rows also go into a
+trigram index (docs_cjk) and queries containing CJK characters are routed there
+("果你" finds any line containing it). Terms shorter than 3 characters can't use
+trigrams and fall back to a LIKE scan of the CJK rows.
+
+A row's lang is the language of its text, not the folder it ships in: the mod
+puts its Vietnamese ConfigDB tables in the game's ConfigDB/en slot, so
+CONFIGDB_LANG maps that folder to "vi" (TextGame folders are named by language).
+"""
+import os
+import re
+import sys
+import csv
+import glob
+import sqlite3
+import argparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+INDEX_FILE = os.path.join(HERE, "corpus_index.db")
+CONFIGDB_DIR = os.path.join(ROOT, "TiengViet_99_P", "Client", "Content", "Aki", "ConfigDB")
+TEXTGAME_DIR = os.path.join(ROOT, "TextGame")
+CONFIGDB_LANG = {"en": "vi"} # ConfigDB folder -> language of its Content
+CJK_LANGS = ("cn", "ja", "ko")
+CJK_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]")
+INDEX_VERSION = 3 # Bump when the schema or indexed values change; older indexes are rebuilt
+
+DROP_ALL = """
+DROP TABLE IF EXISTS docs_fts;
+DROP TABLE IF EXISTS docs_cjk;
+DROP TABLE IF EXISTS docs;
+DROP TABLE IF EXISTS sources;
+"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (path TEXT PRIMARY KEY, size INTEGER, mtime REAL);
+CREATE TABLE IF NOT EXISTS docs (
+    rowid INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    lang TEXT NOT NULL,
+    tbl TEXT NOT NULL,
+    id TEXT NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS docs_source ON docs (source);
+CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(
+    content, content='docs', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS docs_cjk USING fts5(
+    content, content='docs', content_rowid='rowid', tokenize='trigram'
+);
+-- Keep the external-content FTS indexes in sync with docs
+CREATE TRIGGER IF NOT EXISTS docs_ai AFTER INSERT ON docs BEGIN
+    INSERT INTO docs_fts (rowid, content) VALUES (new.rowid, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS docs_ad AFTER DELETE ON docs BEGIN
+    INSERT INTO docs_fts (docs_fts, rowid, content) VALUES ('delete', old.rowid, old.content);
+END;
+CREATE TRIGGER IF NOT EXISTS docs_cjk_ai AFTER INSERT ON docs WHEN new.lang IN {langs} BEGIN
+    INSERT INTO docs_cjk (rowid, content) VALUES (new.rowid, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS docs_cjk_ad AFTER DELETE ON docs WHEN old.lang IN {langs} BEGIN
+    INSERT INTO docs_cjk (docs_cjk, rowid, content) VALUES ('delete', old.rowid, old.content);
+END;
+""".replace("{langs}", str(CJK_LANGS))
+
+
+def connect(index_path=INDEX_FILE):
+    con = sqlite3.connect(index_path)
+    if con.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+        con.executescript(DROP_ALL)
+    con.executescript(SCHEMA)
+    con.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+    return con
+
+
+# --- SOURCES ---
+def find_sources():
+    """Yield (path, lang) for every indexable file; lang is the parent folder name (mapped by CONFIGDB_LANG for ConfigDB)."""
+    for path in sorted(glob.glob(os.path.join(CONFIGDB_DIR, "*", "*.db"))):
+        folder = os.path.basename(os.path.dirname(path))
+        yield path, CONFIGDB_LANG.get(folder, folder)
+    for path in sorted(glob.glob(os.path.join(TEXTGAME_DIR, "*", "*.csv"))):
+        yield path, os.path.basename(os.path.dirname(path))
+
+
+def read_source(path, lang):
+    """Yield (lang, table, id, content) rows from a lang_*.db or TextGame CSV."""
+    if path.endswith(".csv"):
+        table = os.path.splitext(os.path.basename(path))[0]
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            next(reader, None) # Header: Id,Content
+            for row in reader:
+                if len(row) >= 2 and row[1]:
+                    yield lang, table, row[0], row[1]
+        return
+    con = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        tables = [r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+        for table in tables:
+            cols = [r[1] for r in con.execute(f'PRAGMA table_info("{table}")')]
+            if "Id" not in cols or "Content" not in cols: continue
+            for row_id, content in con.execute(f'SELECT Id, Content FROM "{table}"'):
+                if isinstance(content, str) and content:
+                    yield lang, table, str(row_id), content
+    finally:
+        con.close()
+
+
+# --- BUILD ---
+def build(index_path=INDEX_FILE, log=print):
+    """Re-index sources whose size/mtime changed; drop sources that disappeared."""
+    con = connect(index_path)
+    known = {path: (size, mtime) for path, size, mtime in con.execute("SELECT path, size, mtime FROM sources")}
+    seen = set()
+    changed = 0
+    with con:
+        for path, lang in find_sources():
+            key = os.path.relpath(path, ROOT)
+            seen.add(key)
+            st = os.stat(path)
+            if known.get(key) == (st.st_size, st.st_mtime):
+                continue
+            con.execute("DELETE FROM docs WHERE source = ?", (key,))
+            con.executemany("INSERT INTO docs (source, lang, tbl, id, content) VALUES (?, ?, ?, ?, ?)",
+                            ((key,) + row for row in read_source(path, lang)))
+            con.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?)", (key, st.st_size, st.st_mtime))
+            changed += 1
+            log(f"indexed {key}")
+        for key in set(known) - seen:
+            con.execute("DELETE FROM docs WHERE source = ?", (key,))
+            con.execute("DELETE FROM sources WHERE path = ?", (key,))
+            changed += 1
+            log(f"removed {key}")
+    if changed:
+        con.execute("INSERT INTO docs_fts (docs_fts) VALUES ('optimize')")
+        con.execute("INSERT INTO docs_cjk (docs_cjk) VALUES ('optimize')")
+        con.commit()
+    total = con.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+    con.close()
+    log(f"{changed} source(s) updated, {total} rows in index")
+    return changed
+
+
+# --- QUERY ---
+def to_fts_query(text):
+    """Quote each word so user input (quotes, colons, dashes) can't break FTS5 syntax."""
+    words = [w.replace('"', '""') for w in text.split()]
+    return " ".join(f'"{w}"' for w in words)
+
+
+def like_snippet(content, words, width=12):
+    """snippet()-style excerpt around the first word found, for LIKE matches."""
+    pos = min((content.find(w) for w in words if w in content), default=0)
+    word = next((w for w in words if content.find(w) == pos), "")
+    before, after = content[max(0, pos - width):pos], content[pos + len(word):pos + len(word) + width]
+    return (("…" if pos > width else "") + before + f"[{word}]" + after +
+            ("…" if pos + len(word) + width < len(content) else ""))
+
+
+def search(query, lang=None, table=None, limit=20, raw=False, con=None):
+    """
+    Ranked (bm25) matches as dicts: lang, table, id, source, content, snippet.
+    An empty query returns []; a malformed raw query raises sqlite3.OperationalError.
+    """
+    if not query.strip():
+        return []
+    own = con is None
+    con = con or connect()
+    try:
+        words = query.split()
+        cjk = bool(CJK_RE.search(query))
+        like = cjk and not raw and any(len(w) < 3 for w in words)
+        if like:
+            # Trigrams need 3+ characters per term; the CJK rows are few enough to scan
+            sql = ("SELECT d.lang, d.tbl, d.id, d.source, d.content, NULL FROM docs d "
+                   f"WHERE d.lang IN ({', '.join('?' * len(CJK_LANGS))})" + " AND d.content LIKE ? ESCAPE '\\'" * len(words))
+            params = list(CJK_LANGS) + ["%" + re.sub(r"([%_\\])", r"\\\1", w) + "%" for w in words]
+            order = " ORDER BY length(d.content)"
+        else:
+            fts = "docs_cjk" if cjk else "docs_fts"
+            sql = (f"SELECT d.lang, d.tbl, d.id, d.source, d.content, snippet({fts}, 0, '[', ']', '…', 12) "
+                   f"FROM {fts} JOIN docs d ON d.rowid = {fts}.rowid WHERE {fts} MATCH ?")
+            params = [query if raw else to_fts_query(query)]
+            order = f" ORDER BY bm25({fts})"
+        if lang:
+            sql += " AND d.lang = ?"
+            params.append(lang)
+        if table:
+            sql += " AND d.tbl = ?"
+            params.append(table)
+        sql += order + " LIMIT ?"
+        params.append(limit)
+        keys = ("lang", "table", "id", "source", "content", "snippet")
+        hits = [dict(zip(keys, row)) for row in con.execute(sql, params)]
+        if like:
+            for hit in hits: hit['snippet'] = like_snippet(hit['content'], words)
+        return hits
+    finally:
+        if own: con.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-text search over ConfigDB and TextGame.")
+    sub = parser.add_subparsers(dest="mode", required=True)
+    sub.add_parser("build", help="update the index")
+    p_search = sub.add_parser("search", help="query the index")
+    p_search.add_argument("query")
+    p_search.add_argument("--lang")
+    p_search.add_argument("--table")
+    p_search.add_argument("--limit", type=int, default=20)
+    p_search.add_argument("--raw", action="store_true", help="pass the query to FTS5 unquoted (AND/OR/NEAR, prefix*)")
+    args = parser.parse_args()
+
+    if args.mode == "build":
+        build()
+        return
+    if not os.path.exists(INDEX_FILE):
+        build()
+    try:
+        hits = search(args.query, args.lang, args.table, args.limit, args.raw)
+    except sqlite3.OperationalError as e:
+        sys.exit(f"Invalid query: {e}")
+    for hit in hits:
+        print(f"[{hit['lang']}/{hit['table']}] {hit['id']}: {hit['snippet']}")
+
+
+if __name__ == "__main__":
+    main()
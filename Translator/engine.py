@@ -0,0 +1,596 @@
+import os
+import json
+import re
+import time
+import threading
+import math
+import queue
+from collections import deque
+
+# --- CONSTANTS & CONFIG ---
+CONFIG_FILE = "config.json"
+INPUT_FILE = "temp.txt"
+OUTPUT_FILE = "tran.txt"
+TEMP_OUTPUT_FILE = "temp_translating.txt"
+JOURNAL_FILE = "temp_translating.journal"
+MODELS_CACHE_FILE = "models_cache.json"
+
+DEFAULT_SYSTEM_PROMPT = (
+    "# ROLE: Master of Game Localization (English to Vietnamese)\n"
+    "# CONTEXT: Wuthering Waves (Kuro Games) - Sci-fi, Post-apocalyptic, Solaris-3.\n\n"
+    "## 1. MANDATORY TECHNICAL PROTOCOL (STRICT):\n"
+    "- FORMAT: Always '{ID}:::{TranslatedText}'. One ID per line. NO blank lines between IDs.\n"
+    "- INTEGRITY: Preserve {tags}. No new braces.\n"
+    "- LITERALS: Keep '\\n' as literal.\n"
+    "- NO CHAT: Output ONLY translated content.\n\n"
+    "## 5. FINAL EXECUTION:\n"
+    "Translate EVERY line. Format: ID:::Text"
+)
+
+DEFAULT_CONFIG = {
+    "base_url": "https://api.mistral.ai/v1",
+    "api_key": "",
+    "model": "mistral-large-latest",
+    "system_prompt": DEFAULT_SYSTEM_PROMPT,
+    "temperature": 0.2,
+    "max_tokens": 4096,
+    "top_p": 1.0,
+    "top_k": -1, # -1 means ignore
+    "stream": True,
+    "threads": 1,
+    "batch_size": 50,
+    "delay": 1.3,
+    "last_file": "temp.txt",
+    "tm_enabled": True,
+    "tm_source_dir": "../TextGame", # Approved TextGame/<lang>/*.csv pairs
+    "tm_top_k": 5,
+    "glossary": {}, # {"Resonator": "Cộng Hưởng Giả", ...} - part of the cached prompt prefix
+    "stream_include_usage": False, # Send stream_options.include_usage (OpenAI-style providers)
+    "models_cache_ttl": 86400, # Seconds a cached /models list stays valid
+    "hedge_enabled": False, # Fire a backup request when a batch is slower than usual
+    "hedge_percentile": 0.95, # Latency percentile (learned during the run) that triggers the backup
+    "hedge_min_samples": 10, # No hedging until this many batches have been timed
+    "hedge_model": "", # Model for the backup request ("" = same model)
+    "hedge_max_ratio": 0.1, # Max backup requests as a fraction of batches (extra spend cap)
+    "cascade_enabled": False, # Short/simple lines go to cascade_small_model first
+    "cascade_small_model": "mistral-small-latest",
+    "cascade_max_chars": 40, # Longer lines (or lines with <tags>) go straight to the main model
+    "cascade_allow_identical": False, # Known names (glossary entry mapped to itself, or kept as-is in the TM) may come back unchanged
+    "tier_prices": {}, # {"small": {"input": 0.2, "output": 0.6}, "main": {...}} USD per 1M tokens, for the cost column
+    "progress_seconds": 120 # Rewrite temp_translating.txt from the journal at most this often (0 = only at the end)
+}
+
+FORMAT_REMINDER = "REMINDER: Format 'ID:::TranslatedText'."
+
+# --- GLOBAL STATE ---
+config_data = DEFAULT_CONFIG.copy()
+request_lock = threading.Lock()
+last_request_time = 0
+stop_event = threading.Event()
+fetched_models_cache = []
+translation_memory = None
+tm_lock = threading.Lock()
+usage_lock = threading.Lock()
+usage_stats = {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0}
+hedge_lock = threading.Lock()
+latency_samples = deque(maxlen=500) # Seconds per successful request; oldest samples drop out first
+hedge_stats = {"batches": 0, "hedged": 0, "backup_wins": 0, "cancelled": 0}
+tier_stats = {} # tier -> {"lines", "requests", "seconds", "prompt_tokens", "completion_tokens", "escalated"}
+PLACEHOLDER_RE = re.compile(r"\{[^{}]*\}|<[^<>]*>")
+
+# --- UTILS ---
+def load_config():
+    global config_data
+    if os.path.exists(CONFIG_FILE):
+        try:
+            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+                loaded = json.load(f)
+                # Update default with loaded to ensure all keys exist
+                for k, v in loaded.items():
+                    config_data[k] = v
+        except Exception as e:
+            print(f"Error loading config: {e}")
+
+def save_config():
+    try:
+        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
+            json.dump(config_data, f, indent=4, ensure_ascii=False)
+    except Exception as e:
+        print(f"Error saving config: {e}")
+
+def load_models_cache(base_url, ttl):
+    """Return the cached model list for base_url, or None if missing/expired."""
+    try:
+        with open(MODELS_CACHE_FILE, 'r', encoding='utf-8') as f:
+            entry = json.load(f).get(base_url)
+        if entry and time.time() - entry.get('time', 0) < ttl:
+            return entry.get('models', [])
+    except Exception:
+        pass
+    return None
+
+def save_models_cache(base_url, models):
+    try:
+        cache = {}
+        if os.path.exists(MODELS_CACHE_FILE):
+            with open(MODELS_CACHE_FILE, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        cache[base_url] = {"time": time.time(), "models": models}
+        with open(MODELS_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False)
+    except Exception as e:
+        print(f"Error saving models cache: {e}")
+
+def fetch_models(base_url, api_key):
+    """GET {base_url}/models, refresh the disk cache and return sorted ids (None on failure)."""
+    import requests
+    try:
+        r = requests.get(f"{base_url}/models", headers={"Authorization": f"Bearer {api_key}"}, timeout=5)
+        if r.status_code == 200:
+            data = r.json()
+            lst = [m['id'] for m in data['data']] if 'data' in data else [str(m) for m in data]
+            lst.sort()
+            save_models_cache(base_url, lst)
+            return lst
+    except Exception:
+        pass
+    return None
+
+def wait_for_slot(delay_sec):
+    global last_request_time
+    with request_lock:
+        current_time = time.time()
+        elapsed = current_time - last_request_time
+        if elapsed < delay_sec:
+            time.sleep(delay_sec - elapsed)
+        last_request_time = time.time()
+
+def data_start(source):
+    """Index of the first line to translate (skips an optional '0:::' header)."""
+    return 1 if len(source) and source.line(0).startswith("0:::") else 0
+
+def plan_batches(source, batch_size):
+    """Contiguous index ranges of at most batch_size lines."""
+    return [range(i, min(i + batch_size, len(source))) for i in range(data_start(source), len(source), batch_size)]
+
+def plan_ranges(source, n_threads):
+    """Split the input into one contiguous index range per thread."""
+    total = len(source) - data_start(source)
+    if total <= 0: return []
+    return plan_batches(source, math.ceil(total / max(1, n_threads)))
+
+def get_translation_memory(settings):
+    """Build the approved-translation index once and share it between workers."""
+    global translation_memory
+    with tm_lock:
+        if translation_memory is None:
+            src_dir = settings.get('tm_source_dir', '')
+            if src_dir and os.path.isdir(src_dir):
+                try:
+                    from translation_memory import load_textgame_memory
+                    translation_memory = load_textgame_memory(src_dir)
+                except Exception as e:
+                    print(f"Error loading translation memory: {e}")
+        return translation_memory
+
+def reset_usage_stats():
+    with usage_lock:
+        for k in usage_stats: usage_stats[k] = 0
+
+def record_usage(usage):
+    """Accumulate an OpenAI-style 'usage' object, including cached prompt tokens."""
+    if not usage: return
+    details = usage.get('prompt_tokens_details') or {}
+    with usage_lock:
+        usage_stats['requests'] += 1
+        usage_stats['prompt_tokens'] += usage.get('prompt_tokens', 0) or 0
+        usage_stats['cached_tokens'] += details.get('cached_tokens', 0) or 0
+        usage_stats['completion_tokens'] += usage.get('completion_tokens', 0) or 0
+
+def usage_summary():
+    with usage_lock:
+        prompt = usage_stats['prompt_tokens']
+        cached = usage_stats['cached_tokens']
+        ratio = cached / prompt if prompt else 0.0
+        return (f"Prompt tokens: {prompt} (cached {cached}, hit ratio {ratio:.1%}), "
+                f"completion tokens: {usage_stats['completion_tokens']}, requests: {usage_stats['requests']}")
+
+def latency_threshold(settings):
+    """Learned latency percentile, or None while there are too few samples."""
+    with hedge_lock:
+        if len(latency_samples) < settings.get('hedge_min_samples', 10): return None
+        ordered = sorted(latency_samples)
+    idx = min(len(ordered) - 1, int(len(ordered) * settings.get('hedge_percentile', 0.95)))
+    return ordered[idx]
+
+def reserve_hedge(settings):
+    """Count a backup request if it stays within hedge_max_ratio of all batches."""
+    with hedge_lock:
+        if hedge_stats['hedged'] + 1 > hedge_stats['batches'] * settings.get('hedge_max_ratio', 0.1):
+            return False
+        hedge_stats['hedged'] += 1
+        return True
+
+def reset_run_stats():
+    reset_usage_stats()
+    with hedge_lock:
+        latency_samples.clear()
+        for k in hedge_stats: hedge_stats[k] = 0
+    with usage_lock:
+        tier_stats.clear()
+
+def record_tier(tier, lines=0, seconds=0.0, usage=None, escalated=0):
+    with usage_lock:
+        st = tier_stats.setdefault(tier, {"lines": 0, "requests": 0, "seconds": 0.0,
+                                          "prompt_tokens": 0, "completion_tokens": 0, "escalated": 0})
+        if lines:
+            st['lines'] += lines
+            st['requests'] += 1
+            st['seconds'] += seconds
+        if usage:
+            st['prompt_tokens'] += usage.get('prompt_tokens', 0) or 0
+            st['completion_tokens'] += usage.get('completion_tokens', 0) or 0
+        st['escalated'] += escalated
+
+def record_cancelled(tier, usage):
+    """A sent request that lost a hedge race: count it and keep whatever usage it reported."""
+    record_usage(usage)
+    record_tier(tier, usage=usage)
+    with hedge_lock:
+        hedge_stats['cancelled'] += 1
+
+def run_summary():
+    lines = [usage_summary()]
+    with hedge_lock:
+        if hedge_stats['hedged']:
+            lines.append(f"Hedged batches: {hedge_stats['hedged']}/{hedge_stats['batches']} "
+                         f"(backup won {hedge_stats['backup_wins']}, "
+                         f"cancelled in flight {hedge_stats['cancelled']}; their reported tokens are counted above)")
+    with usage_lock:
+        if 'small' in tier_stats:
+            prices = config_data.get('tier_prices') or {}
+            for tier, st in tier_stats.items():
+                avg = st['seconds'] / st['requests'] if st['requests'] else 0.0
+                line = (f"[{tier}] lines: {st['lines']}, requests: {st['requests']}, avg {avg:.1f}s, "
+                        f"tokens in/out: {st['prompt_tokens']}/{st['completion_tokens']}, escalated: {st['escalated']}")
+                price = prices.get(tier)
+                if price:
+                    cost = (st['prompt_tokens'] * price.get('input', 0) +
+                            st['completion_tokens'] * price.get('output', 0)) / 1_000_000
+                    line += f", cost ${cost:.4f}"
+                lines.append(line)
+    return "\n".join(lines)
+
+def build_static_prefix(settings):
+    """
+    Everything that is identical for every batch: system prompt, glossary and
+    format reminder. Kept byte-stable (sorted glossary) so providers can serve it
+    from their prompt cache.
+    """
+    parts = [settings['system_prompt'].strip()]
+    glossary = settings.get('glossary') or {}
+    if glossary:
+        parts.append("## GLOSSARY (source => target):\n" +
+                     "\n".join(f"{k} => {glossary[k]}" for k in sorted(glossary)))
+    parts.append(FORMAT_REMINDER)
+    return "\n\n".join(parts)
+
+def build_messages(batch_lines, settings):
+    """Static prefix first, per-batch content (examples + lines) last."""
+    user_parts = []
+    if settings.get('tm_enabled'):
+        from translation_memory import format_examples
+        tm = get_translation_memory(settings)
+        if tm:
+            examples = format_examples(tm.examples_for_batch(batch_lines, settings.get('tm_top_k', 5)))
+            if examples: user_parts.append(examples)
+    user_parts.append("\n".join(batch_lines))
+    return [
+        {"role": "system", "content": build_static_prefix(settings)},
+        {"role": "user", "content": "\n\n".join(user_parts)},
+    ]
+
+# --- API LOGIC ---
+def call_api_translate(batch_lines, settings, log_callback=None):
+    if stop_event.is_set(): return batch_lines
+    if settings.get('cascade_enabled') and settings.get('cascade_small_model'):
+        return call_api_cascade(batch_lines, settings, log_callback)
+    results = call_main_model(batch_lines, settings, log_callback)
+    return results if results is not None else batch_lines
+
+def call_main_model(batch_lines, settings, log_callback=None):
+    if settings.get('hedge_enabled'):
+        return call_api_hedged(batch_lines, settings, log_callback)
+    return request_translation(batch_lines, settings, log_callback=log_callback)
+
+def split_text(line):
+    return line.split(':::', 1)[1].strip() if ':::' in line else line
+
+def is_simple_line(line, settings):
+    """Short, markup-free lines (UI labels, item names) are safe for the small model."""
+    text = split_text(line)
+    return len(text) <= settings.get('cascade_max_chars', 40) and '<' not in text
+
+def may_stay_unchanged(text, settings):
+    """Known names: a glossary entry that maps to itself, or an approved TM pair left untranslated."""
+    if (settings.get('glossary') or {}).get(text) == text: return True
+    tm = get_translation_memory(settings) if settings.get('tm_enabled') else None
+    return bool(tm) and tm.keeps(text)
+
+def is_valid_translation(src_line, out_line, settings):
+    """Reject empty or untranslated output and any change to {placeholders}/<tags>."""
+    src, out = split_text(src_line), split_text(out_line)
+    if not src: return True
+    if not out: return False
+    if out == src and any(c.isalpha() for c in src): # Letter-free tokens ("100%", "v1.2") may stay as-is
+        return settings.get('cascade_allow_identical', False) and may_stay_unchanged(src, settings)
+    return sorted(PLACEHOLDER_RE.findall(src)) == sorted(PLACEHOLDER_RE.findall(out))
+
+def try_translate(batch_lines, settings, log_callback=None):
+    """Like call_api_translate, but returns None instead of the source lines when the batch failed."""
+    if stop_event.is_set(): return None
+    if settings.get('cascade_enabled') and settings.get('cascade_small_model'):
+        return call_api_cascade(batch_lines, settings, log_callback, strict=True)
+    return call_main_model(batch_lines, settings, log_callback)
+
+def call_api_cascade(batch_lines, settings, log_callback=None, strict=False):
+    """
+    Tier 1: simple lines -> cascade_small_model. Tier 2: complex lines plus any
+    tier-1 line that fails is_valid_translation or is missing from the response -> main
+    model (hedged if enabled).
+    strict: return None if the main tier fails, instead of keeping source text for those lines.
+    """
+    results = list(batch_lines)
+    simple = [i for i, line in enumerate(batch_lines) if is_simple_line(line, settings)]
+    simple_set = set(simple)
+    escalate = [i for i in range(len(batch_lines)) if i not in simple_set]
+
+    if simple:
+        small_state = {"cancel": threading.Event()}
+        small_out = request_translation([batch_lines[i] for i in simple], settings, model=settings['cascade_small_model'],
+                                        state=small_state, tier="small", log_callback=log_callback)
+        missing = set(small_state.get('missing', ()))
+        failed = []
+        for pos, i in enumerate(simple):
+            if small_out is not None and pos not in missing and is_valid_translation(batch_lines[i], small_out[pos], settings):
+                results[i] = small_out[pos]
+            else:
+                failed.append(i)
+        record_tier("small", escalated=len(failed))
+        if failed and log_callback: log_callback(f"[Cascade] {len(failed)} line(s) escalated to {settings['model']}")
+        escalate = sorted(escalate + failed)
+
+    if escalate:
+        main_out = None if stop_event.is_set() else call_main_model([batch_lines[i] for i in escalate], settings, log_callback)
+        if main_out is not None:
+            for pos, i in enumerate(escalate):
+                results[i] = main_out[pos]
+        elif strict:
+            return None
+    return results
+
+def call_api_hedged(batch_lines, settings, log_callback=None):
+    """
+    Send the batch; if it is still running past the learned latency percentile,
+    send a backup (optionally to hedge_model). First valid response wins and
+    the other request is cancelled.
+    """
+    with hedge_lock:
+        hedge_stats['batches'] += 1
+    results_q = queue.Queue()
+    attempts = []
+
+    def launch(tag, model, log):
+        state = {"cancel": threading.Event()}
+        attempts.append((tag, state))
+        def run():
+            res = request_translation(batch_lines, settings, model=model, state=state, tier="main", log_callback=log)
+            results_q.put((tag, res))
+        threading.Thread(target=run, daemon=True).start()
+
+    launch("primary", None, log_callback)
+    primary_state = attempts[0][1]
+    threshold = latency_threshold(settings)
+    pending = 1
+    winner, results = None, None
+    while pending:
+        timeout = None
+        if threshold is not None and len(attempts) == 1:
+            sent_at = primary_state.get('sent_at')
+            timeout = 0.05 if sent_at is None else max(0.0, sent_at + threshold - time.time())
+        try:
+            tag, res = results_q.get(timeout=timeout)
+        except queue.Empty:
+            if primary_state.get('sent_at') is None or stop_event.is_set():
+                continue
+            if reserve_hedge(settings):
+                model = settings.get('hedge_model') or None
+                if log_callback: log_callback(f"[Hedge] Batch slower than {threshold:.1f}s, backup sent to {model or settings['model']}")
+                launch("backup", model, None)
+                pending += 1
+            else:
+                threshold = None # Budget spent: just wait for the primary
+            continue
+        pending -= 1
+        if res is not None:
+            winner, results = tag, res
+            break
+
+    for tag, state in attempts:
+        if tag != winner: cancel_request(state)
+    if winner == "backup":
+        with hedge_lock:
+            hedge_stats['backup_wins'] += 1
+        if log_callback: log_callback("[Hedge] Backup response used")
+    return results
+
+def cancel_request(state):
+    state['cancel'].set()
+    response = state.get('response')
+    if response is not None:
+        try: response.close()
+        except Exception: pass
+
+def request_translation(batch_lines, settings, model=None, state=None, tier="main", log_callback=None):
+    """
+    One chat/completions request. Returns the 'ID:::Text' lines, or None when the
+    request failed or was cancelled. state (optional) exposes 'sent_at'/'response'
+    to call_api_hedged, carries its 'cancel' event and gets 'missing': positions
+    of lines the response left out (filled with their source text).
+    """
+    import requests # Lazy: only needed once a run actually starts
+    state = state if state is not None else {"cancel": threading.Event()}
+    cancel = state['cancel']
+    
+    wait_for_slot(settings['delay'])
+    if cancel.is_set() or stop_event.is_set(): return None
+    
+    endpoint = f"{settings['base_url'].rstrip('/')}/chat/completions"
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {settings['api_key']}"
+    }
+    
+    payload = {
+        "model": model or settings['model'],
+        "messages": build_messages(batch_lines, settings),
+        "temperature": settings['temperature'],
+        "max_tokens": settings['max_tokens'],
+        "top_p": settings['top_p'],
+        "stream": settings['stream']
+    }
+    
+    # Optional parameters
+    if settings.get('top_k', -1) > 0:
+        payload['top_k'] = settings['top_k']
+    if settings['stream'] and settings.get('stream_include_usage'):
+        payload['stream_options'] = {"include_usage": True}
+
+    try:
+        state['sent_at'] = started = time.time()
+        response = requests.post(endpoint, headers=headers, json=payload, timeout=120, stream=settings['stream'])
+        state['response'] = response
+        
+        if response.status_code != 200:
+            err = f"API Error {response.status_code}: {response.text}"
+            if log_callback: log_callback(err)
+            return None
+
+        full_content = ""
+        usage = None
+        
+        if settings['stream']:
+            for line in response.iter_lines():
+                if stop_event.is_set() or cancel.is_set(): break
+                if line:
+                    decoded = line.decode('utf-8').strip()
+                    if decoded.startswith("data: "):
+                        data_str = decoded[6:]
+                        if data_str == "[DONE]": break
+                        try:
+                            data_json = json.loads(data_str)
+                            if data_json.get('usage'): usage = data_json['usage']
+                            delta = data_json['choices'][0].get('delta', {})
+                            content = delta.get('content', '')
+                            if content:
+                                full_content += content
+                                if log_callback: log_callback(content, end="")
+                        except:
+                            pass
+            if log_callback: log_callback("\n[Stream Finished]")
+        else:
+            # Non-stream
+            json_resp = response.json()
+            full_content = json_resp['choices'][0]['message']['content']
+            usage = json_resp.get('usage')
+            if log_callback: log_callback(f"Received: {len(full_content)} chars")
+
+        if cancel.is_set():
+            record_cancelled(tier, usage) # The loser's tokens were still spent
+            return None
+        record_usage(usage)
+        elapsed = time.time() - started
+        record_tier(tier, lines=len(batch_lines), seconds=elapsed, usage=usage)
+        if tier == "main":
+            with hedge_lock:
+                latency_samples.append(elapsed)
+        translated_lines = full_content.strip().split('\n')
+        translated_map = {}
+        for line in translated_lines:
+            if ':::' in line:
+                parts = line.split(':::', 1)
+                t_id = parts[0].strip()
+                t_text = parts[1].strip()
+                translated_map[t_id] = t_text
+            else:
+                match = re.match(r"^(\d+)\s*(?:[|:>.)\]])\s*(.*)", line)
+                if match:
+                    translated_map[match.group(1)] = match.group(2).strip()
+
+        results = []
+        missing = []
+        for pos, line in enumerate(batch_lines):
+            o_id = line.split(':::')[0].strip()
+            if o_id not in translated_map: missing.append(pos)
+            final_text = translated_map.get(o_id, line.split(':::')[1].strip() if ':::' in line else line)
+            results.append(f"{o_id}:::{final_text}")
+        state['missing'] = missing
+        return results
+
+    except Exception as e:
+        if cancel.is_set(): # Closed by the hedging winner
+            record_cancelled(tier, None)
+            return None
+        if log_callback: log_callback(f"Exception: {e}")
+        return None
+
+def worker_process(thread_id, source, line_range, journal, settings, ui_callback):
+    """
+    source: LineIndex over the input, line_range: indices owned by this worker,
+    journal: ResultJournal that receives each finished batch.
+    ui_callback: function(current, total, log_msg)
+    """
+    total_items = len(line_range)
+    
+    start_idx = line_range[0] if total_items else 0
+    end_idx = line_range[-1] if total_items else 0
+    
+    # Init UI
+    ui_callback(0, total_items, f"Ready. Range: {start_idx}-{end_idx}")
+
+    batch_size = settings['batch_size']
+    processed = 0
+
+    for i in range(0, total_items, batch_size):
+        if stop_event.is_set():
+            ui_callback(processed, total_items, "Stopped.")
+            break
+
+        batch_indices = line_range[i:i+batch_size]
+        if journal.is_done(batch_indices): # Already translated in a resumed run
+            processed += len(batch_indices)
+            ui_callback(processed, total_items, "", append=False)
+            continue
+        batch_lines = source.lines(batch_indices.start, batch_indices.stop) # Read lazily from the mmap
+        
+        # Define log callback for this thread
+        def thread_log(msg, end="\n"):
+            ui_callback(processed, total_items, msg, append=True)
+
+        translated_batch = try_translate(batch_lines, settings, log_callback=thread_log)
+        if stop_event.is_set(): # Partial or untouched batch: leave it for the resumed run
+            ui_callback(processed, total_items, "Stopped.")
+            break
+        if translated_batch is None:
+            thread_log(f"Batch {batch_indices.start}-{batch_indices.stop - 1} failed; not saved, it will be retried on resume")
+            processed += len(batch_lines)
+            ui_callback(processed, total_items, "", append=False)
+            continue
+        journal.write_batch(batch_indices, translated_batch)
+        if journal.checkpoint_due(settings.get('progress_seconds', 120)):
+            journal.assemble(source, TEMP_OUTPUT_FILE)
+        
+        processed += len(batch_lines)
+        ui_callback(processed, total_items, "", append=False)
+    
+    ui_callback(total_items, total_items, "Finished.")
@@ -0,0 +1,160 @@
+import os
+import mmap
+import time
+import hashlib
+import threading
+from array import array
+
+
+def file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class LineIndex:
+    """
+    Memory-mapped 'ID:::Text' input file.
+    Only line start offsets are kept in memory (8 bytes per line); the text
+    itself is decoded on demand, so large dumps are never held as Python strings.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.offsets = array('q')
+        size = os.fstat(self.file.fileno()).st_size
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        pos = 0
+        while pos < size:
+            self.offsets.append(pos)
+            nl = self.data.find(b"\n", pos)
+            pos = size if nl == -1 else nl + 1
+        self.offsets.append(size) # Sentinel: end of last line
+        self.digest = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def sha1(self):
+        if self.digest is None:
+            self.digest = hashlib.sha1(self.data).hexdigest()
+        return self.digest
+
+    def key(self):
+        """Identifies this exact input: absolute path, byte size, line count and content hash."""
+        return f"{os.path.abspath(self.path)}|{self.offsets[-1]}|{len(self)}|{self.sha1()}"
+
+    def line(self, i):
+        return self.data[self.offsets[i]:self.offsets[i+1]].decode('utf-8').strip()
+
+    def lines(self, start, end):
+        return [self.line(i) for i in range(start, end)]
+
+    def placeholder(self, i):
+        """Output line for an untranslated entry: 'ID:::' (or the raw line if it has no ID)."""
+        line = self.line(i)
+        if ':::' in line:
+            return line.split(':::', 1)[0].strip() + ":::"
+        return line
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap): self.data.close()
+        self.file.close()
+
+
+class ResultJournal:
+    """
+    Append-only store for translated lines, one 'index<TAB>ID:::Text' record per line.
+    Per line we only remember where its result starts in the journal, and
+    assemble() streams the final file in input order. The first line identifies
+    the input (LineIndex.key()), so a journal left behind by a crash or STOP can
+    be resumed with resume=True.
+    """
+    def __init__(self, path, source, resume=False):
+        self.path = path
+        self.key = source.key()
+        self.lock = threading.Lock()
+        self.assemble_lock = threading.Lock() # One assemble at a time; never held while appending
+        self.positions = array('q', [-1]) * len(source)
+        self.last_checkpoint = time.time()
+        if resume and journal_matches(path, source):
+            end = self._recover()
+            self.file = open(path, 'r+b')
+            self.file.truncate(end) # Drop a record cut off mid-write
+            self.file.seek(end)
+        else:
+            self.file = open(path, 'wb')
+            self.file.write(f"#journal {self.key}\n".encode('utf-8'))
+            self.file.flush()
+
+    def _recover(self):
+        """Rebuild positions from an existing journal; returns the end of the last complete record."""
+        with open(self.path, 'rb') as f:
+            end = len(f.readline())
+            for record in iter(f.readline, b""):
+                if not record.endswith(b"\n"): break
+                idx, _, _ = record.partition(b"\t")
+                try:
+                    i = int(idx)
+                except ValueError:
+                    break
+                if 0 <= i < len(self.positions): self.positions[i] = end
+                end += len(record)
+        return end
+
+    def recovered(self):
+        return sum(1 for p in self.positions if p >= 0)
+
+    def is_done(self, indices):
+        return all(self.positions[i] >= 0 for i in indices)
+
+    def write_batch(self, indices, results):
+        with self.lock:
+            for idx, line in zip(indices, results):
+                self.positions[idx] = self.file.tell()
+                self.file.write(f"{idx}\t{line}".replace('\n', ' ').encode('utf-8') + b"\n")
+            self.file.flush()
+
+    def checkpoint_due(self, interval):
+        """True at most once per `interval` seconds (for periodic progress files)."""
+        with self.lock:
+            now = time.time()
+            if interval <= 0 or now - self.last_checkpoint < interval: return False
+            self.last_checkpoint = now
+            return True
+
+    def assemble(self, source, out_path):
+        """
+        Write the output file in input order. Only the positions are copied under
+        the lock; the file itself is built while other workers keep appending.
+        """
+        with self.lock:
+            self.file.flush()
+            positions = array('q', self.positions)
+        with self.assemble_lock:
+            tmp_path = out_path + ".part"
+            with open(self.path, 'rb') as jf, open(tmp_path, 'w', encoding='utf-8') as out:
+                for i in range(len(source)):
+                    pos = positions[i]
+                    if pos < 0:
+                        out.write(source.placeholder(i) + '\n')
+                    else:
+                        jf.seek(pos)
+                        out.write(jf.readline().decode('utf-8').partition('\t')[2])
+            os.replace(tmp_path, out_path) # Never leave a half-written progress file
+
+    def close(self, remove=False):
+        self.file.close()
+        if remove and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def journal_matches(path, source):
+    """True if path is a journal written for this exact input file."""
+    try:
+        with open(path, 'rb') as f:
+            return f.readline().decode('utf-8').rstrip('\n') == f"#journal {source.key()}"
+    except (OSError, UnicodeDecodeError):
+        return False
@@ -0,0 +1,344 @@
+"""
+Coordinator/worker mode backed by a SQLite job database.
+
+    python job_queue.py coordinate --input temp.txt [--db jobs.db] [--batch-size 50] [--force]
+    python job_queue.py work [--db jobs.db] [--threads 2] [--api-key KEY] [--model NAME]
+    python job_queue.py status [--db jobs.db]
+    python job_queue.py requeue [--db jobs.db]
+    python job_queue.py assemble [--db jobs.db] [--output tran.txt]
+
+The coordinator splits the input into batches (one row per batch in 'jobs').
+Workers - on this host or on others that see the same db/input through a shared
+folder - lease a batch, keep the lease alive with a heartbeat while translating,
+and commit the lines into 'results'. A lease that is not renewed in time (crashed
+or disconnected worker) is handed to the next worker that asks.
+
+A batch whose request fails goes back to 'pending' and is marked 'failed' once it
+has been tried --max-attempts times ('requeue' puts failed jobs back). A worker
+that fails --max-failures batches in a row (bad key, no quota) stops instead of
+draining the queue. The coordinator records the input's line count, size and
+SHA-1; workers refuse to start on a copy that doesn't match.
+
+The db uses SQLite's default rollback journal (not WAL) so it also works on
+network shares; keep lease_seconds well above the slowest batch.
+"""
+import os
+import sys
+import time
+import socket
+import sqlite3
+import argparse
+import threading
+
+import engine
+from input_loader import LineIndex, file_sha1
+
+DEFAULT_DB = "jobs.db"
+LEASE_SECONDS = 300
+POLL_SECONDS = 5
+MAX_ATTEMPTS = 3
+MAX_CONSECUTIVE_FAILURES = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    start INTEGER NOT NULL,
+    stop INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',  -- pending | leased | done | failed
+    owner TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_until);
+CREATE TABLE IF NOT EXISTS results (line INTEGER PRIMARY KEY, text TEXT NOT NULL);
+"""
+
+
+class JobQueue:
+    def __init__(self, path):
+        # isolation_level=None: transactions are explicit (BEGIN IMMEDIATE) so claims can't race
+        self.con = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.con.executescript(SCHEMA)
+
+    def close(self):
+        self.con.close()
+
+    def get_meta(self, key, default=None):
+        row = self.con.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    # --- COORDINATOR ---
+    def create(self, input_path, source, batches, force=False):
+        """Queue a new run. Raises ValueError if the db still holds jobs/results, unless force."""
+        self.con.execute("BEGIN IMMEDIATE")
+        try:
+            jobs = self.con.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+            done = self.con.execute("SELECT COUNT(*) FROM jobs WHERE status = 'done'").fetchone()[0]
+            results = self.con.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            if (jobs or results) and not force:
+                raise ValueError(f"{jobs} job(s) ({done} done) and {results} translated line(s) are already queued; "
+                                 "pass --force to discard them")
+            if jobs or results:
+                print(f"Discarding {jobs} job(s) ({done} done) and {results} translated line(s)")
+            self.con.execute("DELETE FROM jobs")
+            self.con.execute("DELETE FROM results")
+            self.con.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                                 [("input", os.path.abspath(input_path)), ("created", str(time.time())),
+                                  ("lines", str(len(source))), ("size", str(os.path.getsize(input_path))),
+                                  ("sha1", file_sha1(input_path))])
+            self.con.executemany("INSERT INTO jobs (start, stop) VALUES (?, ?)",
+                                 [(r.start, r.stop) for r in batches])
+            self.con.execute("COMMIT")
+        except Exception:
+            self.con.execute("ROLLBACK")
+            raise
+
+    def counts(self):
+        now = time.time()
+        rows = self.con.execute(
+            "SELECT CASE WHEN status = 'leased' AND lease_until < ? THEN 'expired' ELSE status END, COUNT(*) "
+            "FROM jobs GROUP BY 1", (now,)).fetchall()
+        return dict(rows)
+
+    # --- WORKER ---
+    def claim(self, owner, lease_seconds):
+        """Lease the next pending (or expired) batch. Returns (job_id, start, stop) or None."""
+        now = time.time()
+        self.con.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.con.execute(
+                "SELECT id, start, stop FROM jobs WHERE status = 'pending' "
+                "OR (status = 'leased' AND lease_until < ?) ORDER BY id LIMIT 1", (now,)).fetchone()
+            if row:
+                self.con.execute(
+                    "UPDATE jobs SET status = 'leased', owner = ?, lease_until = ?, attempts = attempts + 1 "
+                    "WHERE id = ?", (owner, now + lease_seconds, row[0]))
+            self.con.execute("COMMIT")
+            return row
+        except Exception:
+            self.con.execute("ROLLBACK")
+            raise
+
+    def heartbeat(self, job_id, owner, lease_seconds):
+        """Extend our lease. False if the job was reclaimed by someone else."""
+        cur = self.con.execute(
+            "UPDATE jobs SET lease_until = ? WHERE id = ? AND owner = ? AND status = 'leased'",
+            (time.time() + lease_seconds, job_id, owner))
+        return cur.rowcount == 1
+
+    def complete(self, job_id, indices, lines):
+        """Store a batch's lines and mark it done (first finisher wins if a lease was reclaimed)."""
+        self.con.execute("BEGIN IMMEDIATE")
+        try:
+            status = self.con.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if status and status[0] != 'done':
+                self.con.executemany("INSERT OR REPLACE INTO results VALUES (?, ?)", zip(indices, lines))
+                self.con.execute("UPDATE jobs SET status = 'done', lease_until = NULL WHERE id = ?", (job_id,))
+            self.con.execute("COMMIT")
+        except Exception:
+            self.con.execute("ROLLBACK")
+            raise
+
+    def fail(self, job_id, owner, max_attempts):
+        """Put a failed batch back in the queue, or park it as 'failed' after max_attempts tries."""
+        self.con.execute(
+            "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "owner = NULL, lease_until = NULL WHERE id = ? AND owner = ? AND status = 'leased'",
+            (max_attempts, job_id, owner))
+
+    def requeue_failed(self):
+        cur = self.con.execute("UPDATE jobs SET status = 'pending', attempts = 0 WHERE status = 'failed'")
+        return cur.rowcount
+
+    def verify_input(self, path):
+        """Raise ValueError unless path is the same file the coordinator queued."""
+        expected = (self.get_meta("lines"), self.get_meta("size"), self.get_meta("sha1"))
+        source = LineIndex(path)
+        try:
+            actual = (str(len(source)), str(os.path.getsize(path)), file_sha1(path))
+        finally:
+            source.close()
+        if actual != expected:
+            raise ValueError(f"{path} does not match the queued input "
+                             f"(lines/size/sha1 {actual[0]}/{actual[1]}/{actual[2][:12]}, "
+                             f"expected {expected[0]}/{expected[1]}/{(expected[2] or '')[:12]})")
+
+    def release(self, job_id, owner):
+        """Give a batch back right away (e.g. on Ctrl+C) instead of waiting for the lease to expire."""
+        self.con.execute("UPDATE jobs SET status = 'pending', owner = NULL WHERE id = ? AND owner = ? "
+                         "AND status = 'leased'", (job_id, owner))
+
+    # --- OUTPUT ---
+    def assemble(self, source, out_path):
+        """Stream the final file in input order; untranslated lines get the 'ID:::' placeholder."""
+        cur = self.con.execute("SELECT line, text FROM results ORDER BY line")
+        nxt = cur.fetchone()
+        with open(out_path, 'w', encoding='utf-8') as out:
+            for i in range(len(source)):
+                while nxt and nxt[0] < i: nxt = cur.fetchone()
+                if nxt and nxt[0] == i:
+                    out.write(nxt[1] + '\n')
+                else:
+                    out.write(source.placeholder(i) + '\n')
+
+
+def worker_loop(db_path, input_path, settings, worker_id, lease_seconds,
+                max_attempts=MAX_ATTEMPTS, max_failures=MAX_CONSECUTIVE_FAILURES):
+    queue_db = JobQueue(db_path)
+    source = LineIndex(input_path or queue_db.get_meta("input"))
+    done = 0
+    failures = 0
+    try:
+        while not engine.stop_event.is_set():
+            job = queue_db.claim(worker_id, lease_seconds)
+            if job is None:
+                counts = queue_db.counts()
+                if not counts.get('pending') and not counts.get('leased') and not counts.get('expired'):
+                    break # Nothing left to claim (done or failed)
+                time.sleep(POLL_SECONDS) # Others still hold leases; they may expire
+                continue
+
+            job_id, start, stop = job
+            lost = threading.Event()
+            finished = threading.Event()
+
+            def beat():
+                # Own connection: sqlite3 connections shouldn't be shared across threads
+                hb = JobQueue(db_path)
+                try:
+                    while not finished.wait(lease_seconds / 3):
+                        if not hb.heartbeat(job_id, worker_id, lease_seconds):
+                            lost.set()
+                            break
+                finally:
+                    hb.close()
+            hb_thread = threading.Thread(target=beat, daemon=True)
+            hb_thread.start()
+
+            try:
+                batch = source.lines(start, stop)
+                log = lambda msg, end="\n": print(msg, end=end, flush=True)
+                results = engine.try_translate(batch, settings, log_callback=log)
+            except BaseException:
+                finished.set()
+                queue_db.release(job_id, worker_id)
+                raise
+            finished.set()
+            hb_thread.join()
+
+            if engine.stop_event.is_set():
+                queue_db.release(job_id, worker_id)
+                break
+            if results is None:
+                failures += 1
+                queue_db.fail(job_id, worker_id, max_attempts)
+                print(f"[{worker_id}] job {job_id} failed ({failures} in a row)")
+                if failures >= max_failures:
+                    print(f"[{worker_id}] stopping after {failures} consecutive failures; check api key/quota")
+                    break
+                time.sleep(POLL_SECONDS * failures) # Back off before the next claim
+                continue
+            failures = 0
+            if lost.is_set():
+                print(f"[{worker_id}] lease on job {job_id} was reclaimed; committing anyway")
+            queue_db.complete(job_id, range(start, stop), results)
+            done += 1
+            print(f"[{worker_id}] job {job_id} ({start}-{stop - 1}) done")
+    finally:
+        source.close()
+        queue_db.close()
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distributed translation over a shared SQLite job queue.")
+    parser.add_argument("mode", choices=["coordinate", "work", "status", "assemble", "requeue"])
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--input", help="input file (coordinate) / local path of the same file (work)")
+    parser.add_argument("--output", default=engine.OUTPUT_FILE)
+    parser.add_argument("--batch-size", type=int)
+    parser.add_argument("--threads", type=int, default=1, help="claim loops in this worker process")
+    parser.add_argument("--lease", type=float, default=LEASE_SECONDS, help="lease length in seconds")
+    parser.add_argument("--worker-id", default=f"{socket.gethostname()}-{os.getpid()}")
+    parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS, help="tries per batch before it is marked failed")
+    parser.add_argument("--max-failures", type=int, default=MAX_CONSECUTIVE_FAILURES,
+                        help="consecutive failed batches before a worker loop stops")
+    parser.add_argument("--force", action="store_true", help="coordinate: discard the jobs and results already in --db")
+    parser.add_argument("--config", default=engine.CONFIG_FILE)
+    parser.add_argument("--api-key", help="override config api_key (one key per machine)")
+    parser.add_argument("--model", help="override config model")
+    args = parser.parse_args()
+
+    engine.CONFIG_FILE = args.config
+    engine.load_config()
+    settings = engine.config_data
+    if args.api_key: settings['api_key'] = args.api_key
+    if args.model: settings['model'] = args.model
+
+    if args.mode == "coordinate":
+        if not args.input or not os.path.exists(args.input):
+            sys.exit("coordinate needs an existing --input file")
+        source = LineIndex(args.input)
+        batches = engine.plan_batches(source, args.batch_size or settings['batch_size'])
+        queue_db = JobQueue(args.db)
+        try:
+            queue_db.create(args.input, source, batches, force=args.force)
+        except ValueError as e:
+            sys.exit(f"Refusing to coordinate: {e}")
+        finally:
+            queue_db.close()
+            source.close()
+        print(f"{len(batches)} jobs queued in {args.db}")
+
+    elif args.mode == "work":
+        queue_db = JobQueue(args.db)
+        try:
+            queue_db.verify_input(args.input or queue_db.get_meta("input"))
+        except (OSError, ValueError) as e:
+            sys.exit(f"Refusing to work: {e}")
+        finally:
+            queue_db.close()
+        if settings.get('tm_enabled'):
+            engine.get_translation_memory(settings) # Build once before the claim loops start
+        threads = []
+        for n in range(max(1, args.threads)):
+            worker_id = args.worker_id if args.threads <= 1 else f"{args.worker_id}-{n + 1}"
+            t = threading.Thread(target=worker_loop, args=(args.db, args.input, settings, worker_id, args.lease,
+                                                           args.max_attempts, args.max_failures))
+            t.start()
+            threads.append(t)
+        try:
+            for t in threads: t.join()
+        except KeyboardInterrupt:
+            engine.stop_event.set() # Loops release their current job and exit
+            for t in threads: t.join()
+        print(engine.run_summary())
+
+    elif args.mode == "status":
+        queue_db = JobQueue(args.db)
+        counts = queue_db.counts()
+        print(", ".join(f"{k}: {counts.get(k, 0)}" for k in ("pending", "leased", "expired", "done", "failed")))
+        queue_db.close()
+
+    elif args.mode == "requeue":
+        queue_db = JobQueue(args.db)
+        print(f"{queue_db.requeue_failed()} failed job(s) back to pending")
+        queue_db.close()
+
+    elif args.mode == "assemble":
+        queue_db = JobQueue(args.db)
+        path = args.input or queue_db.get_meta("input")
+        try:
+            queue_db.verify_input(path)
+        except (OSError, ValueError) as e:
+            sys.exit(f"Refusing to assemble: {e}")
+        source = LineIndex(path)
+        queue_db.assemble(source, args.output)
+        source.close()
+        queue_db.close()
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
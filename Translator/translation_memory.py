@@ -0,0 +1,126 @@
+import os
+import csv
+import glob
+import zlib
+import random
+
+# --- MINHASH SETTINGS ---
+NGRAM = 3
+NUM_PERM = 16
+BANDS = 8                      # 8 bands x 2 rows
+ROWS = NUM_PERM // BANDS
+MIN_SCORE = 0.3                # Minimum Jaccard similarity to count as an example
+
+_rng = random.Random(1337)     # Fixed seed -> same signatures every run
+PERM_MASKS = [_rng.getrandbits(32) for _ in range(NUM_PERM)]
+
+
+def shingles(text):
+    """Set of hashed character n-grams of the normalized text."""
+    t = " ".join(text.lower().split())
+    if len(t) < NGRAM:
+        return {zlib.crc32(t.encode('utf-8'))} if t else set()
+    return {zlib.crc32(t[i:i+NGRAM].encode('utf-8')) for i in range(len(t) - NGRAM + 1)}
+
+
+def signature(grams):
+    return tuple(min(g ^ m for g in grams) for m in PERM_MASKS)
+
+
+class TranslationMemory:
+    """
+    MinHash/LSH index over approved (source, target) pairs.
+    query() only scores candidates that share at least one LSH band,
+    so a lookup touches a handful of entries instead of the whole corpus.
+    """
+    def __init__(self):
+        self.entries = []   # List of (source, target, grams)
+        self.buckets = {}   # (band_no, band_hash) -> [entry_index]
+        self.seen = set()
+        self.identical = set() # Approved sources that stay unchanged (names, terms)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, source, target):
+        source, target = source.strip(), target.strip()
+        if source and source == target:
+            self.identical.add(source)
+        if not source or not target or source == target or source in self.seen:
+            return
+        grams = shingles(source)
+        if not grams: return
+        self.seen.add(source)
+        idx = len(self.entries)
+        self.entries.append((source, target, grams))
+        sig = signature(grams)
+        for b in range(BANDS):
+            key = (b, sig[b*ROWS:(b+1)*ROWS])
+            self.buckets.setdefault(key, []).append(idx)
+
+    def keeps(self, text):
+        """True if an approved pair leaves this exact source untranslated."""
+        return text.strip() in self.identical
+
+    def query(self, text, k=3):
+        """Return up to k (score, source, target) tuples, best first."""
+        grams = shingles(text)
+        if not grams or not self.entries: return []
+        sig = signature(grams)
+        candidates = set()
+        for b in range(BANDS):
+            candidates.update(self.buckets.get((b, sig[b*ROWS:(b+1)*ROWS]), ()))
+
+        scored = []
+        for idx in candidates:
+            src, tgt, e_grams = self.entries[idx]
+            score = len(grams & e_grams) / len(grams | e_grams)
+            if score >= MIN_SCORE:
+                scored.append((score, src, tgt))
+        scored.sort(key=lambda x: -x[0])
+        return scored[:k]
+
+    def examples_for_batch(self, batch_lines, k=5):
+        """
+        Pick the k best approved pairs for a batch of 'ID:::Text' lines.
+        Each line contributes its top 2 matches; duplicates keep the best score.
+        """
+        best = {}
+        for line in batch_lines:
+            text = line.split(':::', 1)[1] if ':::' in line else line
+            for score, src, tgt in self.query(text, k=2):
+                if score > best.get(src, (0, None))[0]:
+                    best[src] = (score, tgt)
+        ranked = sorted(best.items(), key=lambda x: -x[1][0])[:k]
+        return [(src, tgt) for src, (score, tgt) in ranked]
+
+
+def _read_csv_dir(folder):
+    rows = {}
+    for path in sorted(glob.glob(os.path.join(folder, "*.csv"))):
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            next(reader, None) # Header: Id,Content
+            for row in reader:
+                if len(row) >= 2:
+                    rows[row[0]] = row[1]
+    return rows
+
+
+def load_textgame_memory(root, source_lang="en", target_lang="vi"):
+    """Build a TranslationMemory from TextGame/<lang>/*.csv files joined on Id."""
+    tm = TranslationMemory()
+    src_rows = _read_csv_dir(os.path.join(root, source_lang))
+    tgt_rows = _read_csv_dir(os.path.join(root, target_lang))
+    for row_id, src in src_rows.items():
+        tgt = tgt_rows.get(row_id)
+        if tgt:
+            tm.add(src, tgt)
+    return tm
+
+
+def format_examples(examples):
+    """Compact few-shot block: one 'source => target' pair per line."""
+    if not examples: return ""
+    return "Approved examples (source => target):\n" + "\n".join(
+        f"{s} => {t}".replace('\n', '\\n') for s, t in examples)
@@ -1,7 +1,5 @@
 import os
 import subprocess
-import urllib.request
-import zipfile
 import json
 import shutil
 import locale
@@ -10,17 +8,39 @@ import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext
 import ctypes
 import logging
+import threading
 
 # Configuration de la journalisation
 log_file = "mod_unpacker.log"
-logging.basicConfig(filename=log_file, level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# Vérifiez si le fichier de log peut être créé
-try:
-    open(log_file, 'a').close()
-except Exception as e:
-    print(f"Error creating log file: {e}")
-    sys.exit(1)
+def setup_logging():
+    logging.basicConfig(filename=log_file, level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+    # Vérifiez si le fichier de log peut être créé
+    try:
+        open(log_file, 'a').close()
+    except Exception as e:
+        print(f"Error creating log file: {e}")
+        sys.exit(1)
+
+# Fichier d'état: emplacement de repak vérifié (évite la vérification à chaque lancement)
+STATE_FILE = "unpacker_state.json"
+REQUIRED_PACKAGES = ["customtkinter", "colorama"]
+
+def load_state():
+    try:
+        with open(STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def save_state(state):
+    try:
+        with open(STATE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=4)
+    except Exception as e:
+        logging.error(f"Error saving state: {e}")
+
+state = load_state()
 
 # Fonction pour installer pip si nécessaire
 def ensure_pip():
@@ -32,16 +52,17 @@ def ensure_pip():
 
 # Fonction pour installer les packages manquants
 def install_packages():
-    ensure_pip()
-    required_packages = ["customtkinter", "colorama"]
-    for package in required_packages:
-        try:
-            __import__(package)
-        except ImportError:
+    # find_spec ne fait qu'une recherche (aucun import): vérifié à chaque lancement
+    import importlib.util
+    for package in REQUIRED_PACKAGES:
+        if importlib.util.find_spec(package) is None:
+            ensure_pip()
             subprocess.check_call([sys.executable, "-m", "pip", "install", package])
 
-# Installation des packages manquants
-install_packages()
+# Installation des packages manquants (seulement au lancement, pas à l'import)
+if __name__ == "__main__":
+    setup_logging()
+    install_packages()
 
 # Initialisation des packages installés
 import customtkinter as ctk
@@ -52,11 +73,6 @@ def hide_console():
     if os.name == 'nt':
         ctypes.windll.user32.ShowWindow(ctypes.windll.kernel32.GetConsoleWindow(), 0)
 
-hide_console()
-
-# Initialisation de colorama
-init(autoreset=True)
-
 # Détection de la langue du système
 lang = locale.getlocale()[0][:2]
 
@@ -77,6 +93,7 @@ REPAK_DIR = os.path.join(os.getcwd(), "repak")
 AES_KEY = "0x6F80948821CA338739A24D4D9F778BCAC0996B2EF2A73897A789C68AFF05174E"
 
 def download_latest_repak():
+    import urllib.request
     latest_url = "https://github.com/trumank/repak/releases/latest"
     with urllib.request.urlopen(latest_url) as response:
         html = response.read().decode('utf-8')
@@ -87,6 +104,8 @@ def download_latest_repak():
         return download_url
 
 def download_and_extract(url, zip_name, extract_to):
+    import urllib.request
+    import zipfile
     if 'repak' in url:
         url = download_latest_repak()
     urllib.request.urlretrieve(url, zip_name)
@@ -94,13 +113,20 @@ def download_and_extract(url, zip_name, extract_to):
         zip_ref.extractall(extract_to)
     os.remove(zip_name)
 
-def setup_repak():
+def setup_repak(log=None):
+    log = log or log_message
+    repak_executable = os.path.join(REPAK_DIR, "repak.exe")
+    if state.get('repak') == repak_executable and os.path.exists(repak_executable):
+        return
     if not os.path.exists(REPAK_DIR):
         try:
             download_and_extract(REPAK_URL, REPAK_ZIP, REPAK_DIR)
         except Exception as e:
-            log_message(f"Error setting up Repak: {e}")
+            log(f"Error setting up Repak: {e}")
             logging.error(f"Error setting up Repak: {e}")
+    if os.path.exists(repak_executable):
+        state['repak'] = repak_executable
+        save_state(state)
 
 def log_message(message):
     console_text.config(state=tk.NORMAL)
@@ -157,8 +183,11 @@ def choose_folder():
     folder_path = filedialog.askdirectory(initialdir=os.getcwd())
     return folder_path
 
-def setup():
-    setup_repak()
+def setup(app):
+    # Téléchargement éventuel de repak hors du thread Tk; les messages reviennent via app.after
+    def ui_log(message):
+        app.after(0, log_message, message)
+    threading.Thread(target=setup_repak, args=(ui_log,), daemon=True).start()
 
 class App(ctk.CTk):
     def __init__(self):
@@ -199,9 +228,12 @@ class App(ctk.CTk):
             repack_pak(folder_name, output_pak)
 
 if __name__ == "__main__":
+    hide_console()
+    # Initialisation de colorama
+    init(autoreset=True)
     try:
-        setup()
         app = App()
+        setup(app)
         app.mainloop()
     except Exception as e:
         logging.error(f"Unhandled exception: {e}")